@@ -3,19 +3,20 @@ AgroMind AI - Flask Application
 """
 from flask import Flask, send_from_directory
 from flask_cors import CORS
-import sys
 import os
-from pathlib import Path
 
-# Add current directory to path
-sys.path.append(str(Path(__file__).parent))
-
-from config import Config
-from routes.api_routes import api
+from .config import Config
+from .routes.api_routes import api
+from .services.ml_service import get_ml_service
+from .services.explainer_service import get_explainer_service
+from .services.ai_agronomist import get_ai_agronomist
+from .services.sustainability_service import get_sustainability_service
+from .utils.json_provider import OrjsonProvider
 
 def create_app():
     """Create and configure Flask application"""
     app = Flask(__name__)
+    app.json = OrjsonProvider(app)
     
     # Configure CORS to allow file:// protocol (for local HTML files)
     CORS(app, resources={
@@ -30,6 +31,15 @@ def create_app():
     # Register blueprints
     app.register_blueprint(api)
     
+    # Build the services now so the first request doesn't pay for loading
+    # the model and SHAP explainer or JIT-compiling the sustainability core
+    # (and, under gunicorn's preload_app, so they're built once before the
+    # workers fork)
+    get_ml_service()
+    get_explainer_service()
+    get_ai_agronomist()
+    get_sustainability_service()
+    
     # Root route
     @app.route('/')
     def index():
@@ -42,6 +52,7 @@ def create_app():
                 'explain': '/api/explain',
                 'ai_advice': '/api/ai-advice',
                 'soil_impact': '/api/soil-impact',
+                'analyze': '/api/analyze',
                 'crops': '/api/crops',
                 'health': '/api/health'
             }
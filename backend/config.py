@@ -29,6 +29,7 @@ class Config:
     DATA_DIR = BASE_DIR / 'data'
     
     MODEL_PATH = MODELS_DIR / 'crop_model.pkl'
+    ONNX_MODEL_PATH = MODELS_DIR / 'crop_model.onnx'
     LABEL_ENCODER_PATH = MODELS_DIR / 'label_encoder.pkl'
     FEATURE_NAMES_PATH = MODELS_DIR / 'feature_names.pkl'
     
@@ -40,6 +41,16 @@ class Config:
     TEST_SIZE = 0.2
     N_ESTIMATORS = 100
     
+    # Request batching (concurrent predictions are coalesced into one call)
+    BATCH_MAX_SIZE = int(os.getenv('BATCH_MAX_SIZE', 32))
+    BATCH_WAIT_TIMEOUT_S = float(os.getenv('BATCH_WAIT_TIMEOUT_S', 0.01))
+    
+    # Response caching (entries per cache, keyed on rounded inputs)
+    CACHE_MAX_SIZE = int(os.getenv('CACHE_MAX_SIZE', 1024))
+    
+    # Model input order (matches the training dataset's column order)
+    FEATURE_ORDER = ('N', 'P', 'K', 'temperature', 'humidity', 'pH', 'rainfall')
+    
     # Feature ranges for validation
     FEATURE_RANGES = {
         'N': (0, 140),
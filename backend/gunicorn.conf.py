@@ -0,0 +1,22 @@
+"""
+Gunicorn configuration for AgroMind AI
+
+Any setting can be overridden at deploy time through GUNICORN_CMD_ARGS,
+e.g. GUNICORN_CMD_ARGS="--workers 3 --threads 8".
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# CPUs this process may run on. Unlike cpu_count(), this honours cgroup
+# cpusets, though not CFS quotas, so set WEB_CONCURRENCY on metered hosts
+_cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+
+# Threaded workers overlap blocking Gemini calls within each process
+worker_class = 'gthread'
+workers = int(os.getenv('WEB_CONCURRENCY', 2 * _cpus + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 5))
+
+# Load the app (and the RandomForest) once in the master, then fork
+# workers that share the model pages copy-on-write
+preload_app = True
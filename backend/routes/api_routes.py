@@ -1,23 +1,64 @@
 """
 API routes for AgroMind AI
 """
-from flask import Blueprint, request, jsonify
-from typing import Dict, Any
-import sys
-from pathlib import Path
+from flask import Blueprint, Response, current_app, g, request, jsonify, stream_with_context
+from werkzeug.exceptions import HTTPException
+from typing import Any, Iterable, Iterator, Tuple
 
-# Add parent directory to path
-sys.path.append(str(Path(__file__).parent.parent))
-
-from services.ml_service import get_ml_service
-from services.explainer_service import get_explainer_service
-from services.ai_agronomist import get_ai_agronomist
-from services.sustainability_service import get_sustainability_service
-from utils.validators import validate_soil_climate_input, validate_crop_name, sanitize_input
+from ..services.ml_service import get_ml_service
+from ..services.explainer_service import get_explainer_service
+from ..services.ai_agronomist import get_ai_agronomist
+from ..services.sustainability_service import get_sustainability_service
+from ..utils.features import FEATURE_ORDER
+from ..utils.validators import decode_soil_climate_input, validate_crop_name
 
 # Create blueprint
 api = Blueprint('api', __name__, url_prefix='/api')
 
+# Endpoints whose body must carry the full soil/climate feature set
+FEATURE_ENDPOINTS = {'api.predict', 'api.explain', 'api.ai_advice', 'api.analyze'}
+
+# Prefix for unexpected-error messages, per endpoint
+ERROR_PREFIXES = {
+    'api.predict': 'Prediction error',
+    'api.explain': 'Explanation error',
+    'api.ai_advice': 'AI advice error',
+    'api.soil_impact': 'Sustainability analysis error',
+    'api.analyze': 'Analysis error',
+    'api.get_crops': 'Error fetching crops'
+}
+
+@api.before_request
+def load_features():
+    """Decode and validate soil/climate input before any ML or LLM work"""
+    # CORS preflights (OPTIONS) carry no body and must get a 2xx
+    if request.method != 'POST' or request.endpoint not in FEATURE_ENDPOINTS:
+        return None
+    
+    data, error_msg = decode_soil_climate_input(request.get_data())
+    if data is None:
+        return jsonify({'error': error_msg}), 400
+    
+    g.data = data
+    g.features = {name: data[name] for name in FEATURE_ORDER}
+    return None
+
+@api.errorhandler(Exception)
+def handle_error(error: Exception):
+    """Report errors from any API route as JSON"""
+    if isinstance(error, HTTPException):
+        return jsonify({'error': error.description}), error.code
+    
+    prefix = ERROR_PREFIXES.get(request.endpoint, 'Internal server error')
+    return jsonify({'error': f'{prefix}: {str(error)}'}), 500
+
+def _sse_events(events: Iterable[Tuple[str, Any]]) -> Iterator[str]:
+    """Format (event, data) pairs as server-sent events"""
+    for event, data in events:
+        payload = data if isinstance(data, str) else current_app.json.dumps(data)
+        lines = ''.join(f'data: {line}\n' for line in payload.split('\n'))
+        yield f'event: {event}\n{lines}\n'
+
 @api.route('/predict', methods=['POST'])
 def predict():
     """
@@ -34,33 +75,15 @@ def predict():
         "rainfall": 202
     }
     """
-    try:
-        # Get request data
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
-        
-        # Sanitize input
-        data = sanitize_input(data)
-        
-        # Validate input
-        is_valid, error_msg = validate_soil_climate_input(data)
-        if not is_valid:
-            return jsonify({'error': error_msg}), 400
-        
-        # Get ML service and predict
-        ml_service = get_ml_service()
-        predictions = ml_service.predict_top_crops(data, n=3)
-        
-        return jsonify({
-            'success': True,
-            'predictions': predictions,
-            'input': data
-        })
-    
-    except Exception as e:
-        return jsonify({'error': f'Prediction error: {str(e)}'}), 500
+    # Get ML service and predict
+    ml_service = get_ml_service()
+    predictions = ml_service.predict_top_crops(g.features, n=3)
+    
+    return jsonify({
+        'success': True,
+        'predictions': predictions,
+        'input': g.features
+    })
 
 @api.route('/explain', methods=['POST'])
 def explain():
@@ -78,45 +101,31 @@ def explain():
         "rainfall": 202,
         "crop": "rice"
     }
+    
+    With ?fast=1 the SHAP values are replaced by a quicker perturbation
+    estimate of each feature's contribution.
     """
-    try:
-        # Get request data
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
-        
-        # Extract crop
-        crop = data.get('crop')
-        if not crop:
-            return jsonify({'error': 'Crop name is required'}), 400
-        
-        # Validate crop
-        ml_service = get_ml_service()
-        valid_crops = ml_service.get_all_crops()
-        is_valid, error_msg = validate_crop_name(crop, valid_crops)
-        if not is_valid:
-            return jsonify({'error': error_msg}), 400
-        
-        # Sanitize and validate soil/climate data
-        features = sanitize_input({
-            k: v for k, v in data.items() if k != 'crop'
-        })
-        is_valid, error_msg = validate_soil_climate_input(features)
-        if not is_valid:
-            return jsonify({'error': error_msg}), 400
-        
-        # Get explanation
-        explainer_service = get_explainer_service()
-        explanation = explainer_service.explain_prediction(features, crop)
-        
-        return jsonify({
-            'success': True,
-            'explanation': explanation
-        })
-    
-    except Exception as e:
-        return jsonify({'error': f'Explanation error: {str(e)}'}), 500
+    # Extract crop
+    crop = g.data['crop']
+    if not crop:
+        return jsonify({'error': 'Crop name is required'}), 400
+    
+    # Validate crop
+    ml_service = get_ml_service()
+    is_valid, error_msg = validate_crop_name(crop, ml_service.get_crop_set())
+    if not is_valid:
+        return jsonify({'error': error_msg}), 400
+    
+    # Get explanation
+    explainer_service = get_explainer_service()
+    explanation = explainer_service.explain_prediction(
+        g.features, crop, fast=request.args.get('fast') == '1'
+    )
+    
+    return jsonify({
+        'success': True,
+        'explanation': explanation
+    })
 
 @api.route('/ai-advice', methods=['POST'])
 def ai_advice():
@@ -135,46 +144,38 @@ def ai_advice():
         "rainfall": 202,
         "location": "Punjab" (optional)
     }
+    
+    With ?stream=1 the answer is sent as server-sent events: "chunk" events
+    carry text as Gemini generates it, and a final "advice" event carries
+    the parsed JSON response.
     """
-    try:
-        # Get request data
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
-        
-        # Extract crop
-        crop = data.get('crop')
-        if not crop:
-            return jsonify({'error': 'Crop name is required'}), 400
-        
-        # Extract location (optional)
-        location = data.get('location')
-        
-        # Prepare soil and climate parameters
-        soil_params = {
-            'N': data.get('N'),
-            'P': data.get('P'),
-            'K': data.get('K'),
-            'pH': data.get('pH')
-        }
-        
-        climate_params = {
-            'temperature': data.get('temperature'),
-            'humidity': data.get('humidity'),
-            'rainfall': data.get('rainfall')
-        }
-        
-        # Get AI advice
-        ai_agronomist = get_ai_agronomist()
-        advice = ai_agronomist.get_farming_advice(
+    # Extract crop
+    crop = g.data['crop']
+    if not crop:
+        return jsonify({'error': 'Crop name is required'}), 400
+    
+    # Extract location (optional)
+    location = g.data['location']
+    
+    # Prepare soil and climate parameters
+    features = g.features
+    soil_params = {name: features[name] for name in ('N', 'P', 'K', 'pH')}
+    climate_params = {name: features[name] for name in ('temperature', 'humidity', 'rainfall')}
+    
+    # Get AI advice
+    ai_agronomist = get_ai_agronomist()
+    
+    if request.args.get('stream') == '1':
+        events = ai_agronomist.stream_farming_advice(
             crop, soil_params, climate_params, location
         )
-        
-        return jsonify(advice)
+        return Response(stream_with_context(_sse_events(events)), mimetype='text/event-stream')
     
-    except Exception as e:
-        return jsonify({'error': f'AI advice error: {str(e)}'}), 500
+    advice = ai_agronomist.get_farming_advice(
+        crop, soil_params, climate_params, location
+    )
+    
+    return jsonify(advice)
 
 @api.route('/soil-impact', methods=['POST'])
 def soil_impact():
@@ -192,43 +193,87 @@ def soil_impact():
         "duration_months": 4 (optional)
     }
     """
-    try:
-        # Get request data
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
-        
-        # Extract crop
-        crop = data.get('crop')
-        if not crop:
-            return jsonify({'error': 'Crop name is required'}), 400
-        
-        # Prepare soil parameters
-        soil_params = {
-            'N': data.get('N'),
-            'P': data.get('P'),
-            'K': data.get('K'),
-            'pH': data.get('pH'),
-            'rainfall': data.get('rainfall')
-        }
-        
-        # Get duration
-        duration = data.get('duration_months', 4)
-        
-        # Get sustainability analysis
-        sustainability_service = get_sustainability_service()
-        analysis = sustainability_service.analyze_soil_impact(
-            crop, soil_params, duration
-        )
-        
-        return jsonify({
-            'success': True,
-            'analysis': analysis
-        })
-    
-    except Exception as e:
-        return jsonify({'error': f'Sustainability analysis error: {str(e)}'}), 500
+    # Get request data
+    data = request.get_json(silent=True)
+    
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+    
+    # Extract crop
+    crop = data.get('crop')
+    if not crop:
+        return jsonify({'error': 'Crop name is required'}), 400
+    
+    # Prepare soil parameters
+    soil_params = {
+        'N': data.get('N'),
+        'P': data.get('P'),
+        'K': data.get('K'),
+        'pH': data.get('pH'),
+        'rainfall': data.get('rainfall')
+    }
+    
+    # Get duration
+    duration = data.get('duration_months', 4)
+    
+    # Get sustainability analysis
+    sustainability_service = get_sustainability_service()
+    analysis = sustainability_service.analyze_soil_impact(
+        crop, soil_params, duration
+    )
+    
+    return jsonify({
+        'success': True,
+        'analysis': analysis
+    })
+
+@api.route('/analyze', methods=['POST'])
+def analyze():
+    """
+    Predict, explain and analyze sustainability in a single request
+    
+    Validates the input once and reuses the same feature array for the
+    prediction and the SHAP explanation of the top crop. Accepts ?fast=1
+    like /api/explain.
+    
+    Request body:
+    {
+        "N": 90,
+        "P": 42,
+        "K": 43,
+        "pH": 6.5,
+        "temperature": 20.8,
+        "humidity": 82,
+        "rainfall": 202,
+        "duration_months": 4 (optional)
+    }
+    """
+    features = g.features
+    
+    # Predict top crops
+    ml_service = get_ml_service()
+    feature_array = ml_service.prepare_features(features)
+    predictions = ml_service.predict_top_crops(features, n=3, feature_array=feature_array)
+    top_crop = predictions[0]['crop']
+    
+    # Explain the top crop
+    explainer_service = get_explainer_service()
+    explanation = explainer_service.explain_prediction(
+        features, top_crop, feature_array, fast=request.args.get('fast') == '1'
+    )
+    
+    # Analyze soil impact of the top crop
+    sustainability_service = get_sustainability_service()
+    sustainability = sustainability_service.analyze_soil_impact(
+        top_crop, features, g.data['duration_months']
+    )
+    
+    return jsonify({
+        'success': True,
+        'predictions': predictions,
+        'explanation': explanation,
+        'sustainability': sustainability
+    })
 
 @api.route('/health', methods=['GET'])
 def health():
@@ -242,15 +287,11 @@ def health():
 @api.route('/crops', methods=['GET'])
 def get_crops():
     """Get list of all available crops"""
-    try:
-        ml_service = get_ml_service()
-        crops = ml_service.get_all_crops()
-        
-        return jsonify({
-            'success': True,
-            'crops': crops,
-            'count': len(crops)
-        })
-    
-    except Exception as e:
-        return jsonify({'error': f'Error fetching crops: {str(e)}'}), 500
+    ml_service = get_ml_service()
+    crops = ml_service.get_all_crops()
+    
+    return jsonify({
+        'success': True,
+        'crops': crops,
+        'count': len(crops)
+    })
@@ -2,14 +2,12 @@
 AI Agronomist service using Gemini API
 """
 import os
-from typing import Dict, Any, Optional
-from pathlib import Path
-import sys
+import re
+import threading
+from typing import Dict, Any, Iterator, Optional, Tuple
 
-# Add parent directory to path
-sys.path.append(str(Path(__file__).parent.parent))
-
-from config import Config
+from ..config import Config
+from ..utils.cache import LRUCache
 
 # Try to import Gemini
 try:
@@ -19,6 +17,45 @@ except ImportError:
     GEMINI_AVAILABLE = False
     print("⚠️  google-generativeai not installed. AI Agronomist will be disabled.")
 
+# Section headers such as "**1. Suitability Assessment:**", "### Best Sowing
+# Season" or "3. **Fertilizer Recommendations**:". A header must end in a colon
+# or bold marker unless it is a markdown "#" heading.
+SECTION_RE = re.compile(
+    r'^[ \t]*(?P<hash>#+[ \t]*)?(?:\*\*)?(?:\d+\.[ \t]*)?(?:\*\*)?'
+    r'[^\n:*]{0,40}?\b(?P<key>suitab|sowing|planting|fertili|disease|pest|yield)[^\n:*]*'
+    r'(?::[ \t]*(?:\*\*)?|\*\*[ \t]*:?|(?(hash)[ \t]*$|(?!)))',
+    re.IGNORECASE | re.MULTILINE
+)
+
+# Bullet / numbering prefixes and leftover markdown header lines in a section body
+BULLET_RE = re.compile(r'^[ \t]*(?:[-*•]|\d+\.)[ \t]*|^[ \t]*#.*$', re.MULTILINE)
+
+WHITESPACE_RE = re.compile(r'\s+')
+
+# Header keyword -> advice section
+SECTION_KEYS = {
+    'suitab': 'suitability',
+    'sowing': 'sowing_season',
+    'planting': 'sowing_season',
+    'fertili': 'fertilizer',
+    'disease': 'disease_risks',
+    'pest': 'disease_risks',
+    'yield': 'yield_tips'
+}
+
+# Bucket widths for the advice cache key. Gemini's advice doesn't change with
+# a few kg/ha or tenths of a degree, so requests for the same crop and location
+# whose readings fall in the same buckets share one answer (and one API call).
+ADVICE_BUCKETS = {
+    'N': 10,
+    'P': 10,
+    'K': 10,
+    'pH': 0.5,
+    'temperature': 2,
+    'humidity': 5,
+    'rainfall': 25
+}
+
 class AIAgronomist:
     """AI-powered agricultural advisor using Gemini"""
     
@@ -26,6 +63,7 @@ class AIAgronomist:
         """Initialize AI Agronomist"""
         self.model = None
         self.api_key = Config.GEMINI_API_KEY
+        self._advice_cache = LRUCache(maxsize=Config.CACHE_MAX_SIZE)
         
         if self.api_key and GEMINI_AVAILABLE:
             self._initialize_gemini()
@@ -49,6 +87,10 @@ class AIAgronomist:
         """
         Get comprehensive farming advice for a crop
         
+        Gemini's sync client is used on purpose: its async client binds to
+        the event loop of its first call, and Flask runs async views on a
+        fresh loop per request. Gunicorn's threads already overlap calls.
+        
         Args:
             crop: Crop name
             soil_params: Dict with N, P, K, pH
@@ -59,11 +101,27 @@ class AIAgronomist:
             Dictionary with farming advice
         """
         if not self.model:
-            return {
-                'success': False,
-                'error': 'AI Agronomist not available. Please configure GEMINI_API_KEY.'
-            }
+            return self._unavailable()
+        
+        # Requests in the same buckets share one Gemini call; only successes are cached
+        key = self._advice_key(crop, soil_params, climate_params, location)
+        future, is_owner = self._advice_cache.claim(key)
+        if not is_owner:
+            return future.result()
         
+        try:
+            advice = self._generate_advice(crop, soil_params, climate_params, location)
+        except BaseException as e:
+            self._advice_cache.fail(key, e)
+            raise
+        
+        self._advice_cache.resolve(key, advice, store=advice['success'])
+        return advice
+    
+    def _generate_advice(self, crop: str, soil_params: Dict[str, float], 
+                         climate_params: Dict[str, float], 
+                         location: Optional[str]) -> Dict[str, Any]:
+        """Call Gemini and parse its answer into an advice dict"""
         try:
             # Build prompt
             prompt = self._build_prompt(crop, soil_params, climate_params, location)
@@ -71,21 +129,111 @@ class AIAgronomist:
             # Generate response
             response = self.model.generate_content(prompt)
             
-            # Parse and format response
-            advice = self._parse_response(response.text)
+            return self._build_advice(crop, response.text)
+        
+        except Exception as e:
+            return self._error(e)
+    
+    def stream_farming_advice(self, crop: str, soil_params: Dict[str, float], 
+                              climate_params: Dict[str, float], 
+                              location: Optional[str] = None) -> Iterator[Tuple[str, Any]]:
+        """
+        Stream farming advice from Gemini as it is generated
+        
+        Args:
+            crop: Crop name
+            soil_params: Dict with N, P, K, pH
+            climate_params: Dict with temperature, humidity, rainfall
+            location: Optional location for region-specific advice
             
-            return {
-                'success': True,
-                'crop': crop,
-                'advice': advice,
-                'raw_response': response.text
-            }
+        Yields:
+            ('chunk', text) for each piece of the answer, then a single
+            ('advice', dict) with the same result get_farming_advice returns
+        """
+        if not self.model:
+            yield 'advice', self._unavailable()
+            return
+        
+        # Cached or in-flight answers are replayed instead of streamed again
+        key = self._advice_key(crop, soil_params, climate_params, location)
+        future, is_owner = self._advice_cache.claim(key)
+        if not is_owner:
+            advice = future.result()
+            if advice['success']:
+                yield 'chunk', advice['raw_response']
+            yield 'advice', advice
+            return
         
+        advice = None
+        try:
+            prompt = self._build_prompt(crop, soil_params, climate_params, location)
+            
+            parts = []
+            for chunk in self.model.generate_content(prompt, stream=True):
+                parts.append(chunk.text)
+                yield 'chunk', chunk.text
+            
+            advice = self._build_advice(crop, ''.join(parts))
         except Exception as e:
-            return {
-                'success': False,
-                'error': f'AI Agronomist error: {str(e)}'
-            }
+            advice = self._error(e)
+        finally:
+            # Release waiters even if the client disconnected mid-stream
+            if advice is None:
+                self._advice_cache.resolve(
+                    key, self._error('response stream was interrupted'), store=False
+                )
+            else:
+                self._advice_cache.resolve(key, advice, store=advice['success'])
+        
+        yield 'advice', advice
+    
+    def _build_advice(self, crop: str, response_text: str) -> Dict[str, Any]:
+        """Parse Gemini's answer into the advice response"""
+        return {
+            'success': True,
+            'crop': crop,
+            'advice': self._parse_response(response_text),
+            'raw_response': response_text
+        }
+    
+    @staticmethod
+    def _unavailable() -> Dict[str, Any]:
+        """Response returned when Gemini is not configured"""
+        return {
+            'success': False,
+            'error': 'AI Agronomist not available. Please configure GEMINI_API_KEY.'
+        }
+    
+    @staticmethod
+    def _error(error: Any) -> Dict[str, Any]:
+        """Response returned when a Gemini call fails"""
+        return {
+            'success': False,
+            'error': f'AI Agronomist error: {str(error)}'
+        }
+    
+    @classmethod
+    def _advice_key(cls, crop: str, soil_params: Dict[str, Any], 
+                    climate_params: Dict[str, Any], location: Optional[str]) -> tuple:
+        """Build the advice cache key"""
+        # The JSON fallback decoder doesn't type-check crop and location
+        return (
+            str(crop).strip().lower(),
+            cls._bucketize(soil_params),
+            cls._bucketize(climate_params),
+            str(location).strip().lower() if location else None
+        )
+    
+    @staticmethod
+    def _bucketize(params: Dict[str, Any]) -> tuple:
+        """Build a hashable cache key from request parameters, snapping numbers to ADVICE_BUCKETS"""
+        key = []
+        for name, value in sorted(params.items()):
+            if isinstance(value, (int, float)):
+                step = ADVICE_BUCKETS.get(name)
+                value = round(round(value / step) * step, 2) if step else round(value, 2)
+            key.append((name, value))
+        return tuple(key)
     
     def _build_prompt(self, crop: str, soil_params: Dict[str, float], 
                      climate_params: Dict[str, float], 
@@ -124,7 +272,7 @@ Keep language simple and practical. Avoid overly technical jargon. Focus on acti
         return prompt
     
     def _parse_response(self, response_text: str) -> Dict[str, str]:
-        """Parse AI response into structured sections with improved detection"""
+        """Parse AI response into structured sections in a single regex pass"""
         
         sections = {
             'suitability': '',
@@ -135,94 +283,29 @@ Keep language simple and practical. Avoid overly technical jargon. Focus on acti
             'full_text': response_text
         }
         
-        # Split by lines and process
-        lines = response_text.split('\n')
-        current_section = None
-        section_content = []
-        
-        for line in lines:
-            line_stripped = line.strip()
-            if not line_stripped:
-                continue
-                
-            line_lower = line_stripped.lower()
+        headers = list(SECTION_RE.finditer(response_text))
+        
+        # Each section body runs from the end of its header to the next header
+        for header, next_header in zip(headers, headers[1:] + [None]):
+            body_end = next_header.start() if next_header else len(response_text)
+            body = BULLET_RE.sub('', response_text[header.end():body_end])
+            body = WHITESPACE_RE.sub(' ', body).strip()
             
-            # Detect section headers (with various formats)
-            if any(keyword in line_lower for keyword in ['suitability', 'suitable for']):
-                if current_section and section_content:
-                    sections[current_section] = ' '.join(section_content)
-                current_section = 'suitability'
-                section_content = []
-                # Include content after header if on same line
-                if ':' in line_stripped:
-                    content = line_stripped.split(':', 1)[1].strip()
-                    if content and not content.startswith('*'):
-                        section_content.append(content)
-            elif any(keyword in line_lower for keyword in ['sowing', 'planting', 'season']):
-                if current_section and section_content:
-                    sections[current_section] = ' '.join(section_content)
-                current_section = 'sowing_season'
-                section_content = []
-                if ':' in line_stripped:
-                    content = line_stripped.split(':', 1)[1].strip()
-                    if content and not content.startswith('*'):
-                        section_content.append(content)
-            elif any(keyword in line_lower for keyword in ['fertilizer', 'npk', 'nutrient']):
-                if current_section and section_content:
-                    sections[current_section] = ' '.join(section_content)
-                current_section = 'fertilizer'
-                section_content = []
-                if ':' in line_stripped:
-                    content = line_stripped.split(':', 1)[1].strip()
-                    if content and not content.startswith('*'):
-                        section_content.append(content)
-            elif any(keyword in line_lower for keyword in ['disease', 'pest', 'risk']):
-                if current_section and section_content:
-                    sections[current_section] = ' '.join(section_content)
-                current_section = 'disease_risks'
-                section_content = []
-                if ':' in line_stripped:
-                    content = line_stripped.split(':', 1)[1].strip()
-                    if content and not content.startswith('*'):
-                        section_content.append(content)
-            elif any(keyword in line_lower for keyword in ['yield', 'optimization', 'tips', 'maximize']):
-                if current_section and section_content:
-                    sections[current_section] = ' '.join(section_content)
-                current_section = 'yield_tips'
-                section_content = []
-                if ':' in line_stripped:
-                    content = line_stripped.split(':', 1)[1].strip()
-                    if content and not content.startswith('*'):
-                        section_content.append(content)
-            elif current_section:
-                # Add content to current section, handling bullet points
-                if line_stripped.startswith(('*', '-', '•', '1.', '2.', '3.', '4.', '5.')):
-                    # Clean up bullet point
-                    content = line_stripped.lstrip('*-•0123456789. ').strip()
-                    if content:
-                        section_content.append(content)
-                elif not line_stripped.startswith('#'):  # Skip markdown headers
-                    section_content.append(line_stripped)
-        
-        # Save last section
-        if current_section and section_content:
-            sections[current_section] = ' '.join(section_content)
-        
-        # Clean up sections - remove extra spaces and format
-        for key in sections:
-            if key != 'full_text':
-                sections[key] = sections[key].strip()
-                # Remove multiple spaces
-                sections[key] = ' '.join(sections[key].split())
+            if body:
+                sections[SECTION_KEYS[header.group('key').lower()]] = body
         
         return sections
 
 # Singleton instance
 _ai_agronomist = None
+_ai_agronomist_lock = threading.Lock()
 
 def get_ai_agronomist() -> AIAgronomist:
     """Get or create AI agronomist singleton"""
     global _ai_agronomist
     if _ai_agronomist is None:
-        _ai_agronomist = AIAgronomist()
+        # Double-checked so concurrent first requests build it only once
+        with _ai_agronomist_lock:
+            if _ai_agronomist is None:
+                _ai_agronomist = AIAgronomist()
     return _ai_agronomist
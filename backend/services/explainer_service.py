@@ -3,15 +3,15 @@ Explainable AI service using SHAP and feature importance
 """
 import numpy as np
 import shap
-from typing import Dict, Any, List
-from pathlib import Path
-import sys
+import threading
+from typing import Dict, Any, List, Optional
 
-# Add parent directory to path
-sys.path.append(str(Path(__file__).parent.parent))
-
-from services.ml_service import get_ml_service
-from utils.helpers import generate_human_readable_explanation
+from .ml_service import get_ml_service
+from ..utils.helpers import generate_human_readable_explanation, get_top_features
+from ..utils.batching import MicroBatcher
+from ..utils.cache import LRUCache, rounded_key
+from ..utils.features import FEATURE_ORDER, to_array
+from ..config import Config
 
 class ExplainerService:
     """Service for generating explanations for predictions"""
@@ -20,25 +20,45 @@ class ExplainerService:
         """Initialize explainer service"""
         self.ml_service = get_ml_service()
         self.explainer = None
+        self._expected_values = None
+        self._crop_idx = {crop: i for i, crop in enumerate(self.ml_service.get_all_crops())}
+        # Importances are fixed per model, so rank the explained features once
+        self._top_features = get_top_features(self.ml_service.get_feature_importance())
+        # Reference values substituted for each feature by _fast_attribution()
+        self._baseline = np.array(
+            [np.mean(Config.FEATURE_RANGES[name]) for name in FEATURE_ORDER],
+            dtype=np.float32
+        )
         self._initialize_shap()
+        self._batcher = MicroBatcher(
+            self._shap_values_batch,
+            max_batch_size=Config.BATCH_MAX_SIZE,
+            batch_wait_timeout_s=Config.BATCH_WAIT_TIMEOUT_S
+        )
+        self._shap_cache = LRUCache(maxsize=Config.CACHE_MAX_SIZE)
     
     def _initialize_shap(self):
         """Initialize SHAP explainer"""
         try:
             # Use TreeExplainer for RandomForest
             self.explainer = shap.TreeExplainer(self.ml_service.model)
+            self._expected_values = np.atleast_1d(np.asarray(self.explainer.expected_value))
             print("✓ SHAP explainer initialized")
         except Exception as e:
             print(f"⚠️  SHAP initialization warning: {e}")
             self.explainer = None
     
-    def explain_prediction(self, features: Dict[str, float], crop: str) -> Dict[str, Any]:
+    def explain_prediction(self, features: Dict[str, float], crop: str,
+                           feature_array: Optional[np.ndarray] = None,
+                           fast: bool = False) -> Dict[str, Any]:
         """
         Generate comprehensive explanation for a crop prediction
         
         Args:
             features: Input features (N, P, K, pH, temperature, humidity, rainfall)
             crop: Crop to explain
+            feature_array: Optional precomputed array from MLService.prepare_features()
+            fast: Use the perturbation approximation instead of exact SHAP values
             
         Returns:
             Dictionary with feature importance, SHAP values, and human explanation
@@ -48,12 +68,14 @@ class ExplainerService:
         
         # Get SHAP values if available
         shap_values = None
-        if self.explainer:
-            shap_values = self._get_shap_values(features, crop)
+        if fast:
+            shap_values = self._fast_attribution(features, crop, feature_array)
+        elif self.explainer:
+            shap_values = self._get_shap_values(features, crop, feature_array)
         
         # Generate human-readable explanation
         human_explanation = generate_human_readable_explanation(
-            features, crop, feature_importance
+            features, crop, self._top_features
         )
         
         # Prepare visualization data
@@ -68,44 +90,97 @@ class ExplainerService:
             'features': features
         }
     
-    def _get_shap_values(self, features: Dict[str, float], crop: str) -> Dict[str, Any]:
+    def _get_shap_values(self, features: Dict[str, float], crop: str,
+                         feature_array: Optional[np.ndarray] = None) -> Dict[str, Any]:
         """Calculate SHAP values for the prediction"""
         try:
-            # Prepare feature array
-            feature_array = np.array([[
-                features['N'],
-                features['P'],
-                features['K'],
-                features['pH'],
-                features['temperature'],
-                features['humidity'],
-                features['rainfall']
-            ]])
+            # Prepare feature array unless the caller already built it
+            if feature_array is None:
+                feature_array = to_array(features)
             
-            # Calculate SHAP values
-            shap_vals = self.explainer.shap_values(feature_array)
+            # Calculate SHAP values for every crop at once, cached on the
+            # rounded inputs and batched with concurrent requests
+            shap_vals = self._shap_cache.get_or_compute(
+                rounded_key(feature_array[0]),
+                lambda: self._batcher.run(feature_array[0])
+            )
             
             # Get crop index
-            all_crops = self.ml_service.get_all_crops()
-            crop_idx = all_crops.index(crop)
+            crop_idx = self._crop_idx[crop]
             
             # Extract SHAP values for this crop
-            crop_shap_values = shap_vals[crop_idx][0] if isinstance(shap_vals, list) else shap_vals[0]
+            crop_shap_values = shap_vals[crop_idx]
             
             # Create feature-to-shap mapping
-            shap_dict = {
-                feature: float(shap_val)
-                for feature, shap_val in zip(self.ml_service.feature_names, crop_shap_values)
-            }
+            shap_dict = dict(zip(FEATURE_ORDER, crop_shap_values))
+            
+            # Base value is per crop for multi-class models
+            expected = self._expected_values
             
             return {
                 'values': shap_dict,
-                'base_value': float(self.explainer.expected_value[crop_idx]) if isinstance(self.explainer.expected_value, np.ndarray) else float(self.explainer.expected_value)
+                'base_value': expected[crop_idx] if expected.size > 1 else expected[0]
             }
         except Exception as e:
             print(f"⚠️  SHAP calculation error: {e}")
             return None
     
+    def _fast_attribution(self, features: Dict[str, float], crop: str,
+                          feature_array: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """
+        Approximate per-feature contributions with one batched prediction
+        
+        Row 0 of an (8, 7) batch is the input and row i + 1 replaces feature
+        i with its baseline, so a feature's attribution is how much the crop's
+        probability drops without it. One forest traversal instead of SHAP's
+        exact tree walk; rankings match closely for display purposes.
+        
+        Args:
+            features: Input features
+            crop: Crop to explain
+            feature_array: Optional precomputed array from MLService.prepare_features()
+            
+        Returns:
+            Dictionary with per-feature attributions and the crop's probability
+        """
+        try:
+            if feature_array is None:
+                feature_array = to_array(features)
+            
+            n_features = feature_array.shape[1]
+            batch = np.repeat(feature_array, n_features + 1, axis=0)
+            rows = np.arange(n_features)
+            batch[rows + 1, rows] = self._baseline
+            
+            probs = self.ml_service.predict_proba_batch(batch)[:, self._crop_idx[crop]]
+            attribution = probs[0] - probs[1:]
+            
+            return {
+                'values': dict(zip(FEATURE_ORDER, attribution)),
+                'prediction': probs[0],
+                'method': 'perturbation'
+            }
+        except Exception as e:
+            print(f"⚠️  Fast attribution error: {e}")
+            return None
+    
+    def _shap_values_batch(self, feature_matrix: np.ndarray) -> np.ndarray:
+        """
+        Calculate SHAP values for a batch of feature rows
+        
+        Args:
+            feature_matrix: float32 array of shape (B, 7) in model feature order
+            
+        Returns:
+            Array of shape (B, n_crops, 7) with per-class SHAP values
+        """
+        shap_vals = self.explainer.shap_values(feature_matrix)
+        
+        # Older SHAP returns one (B, 7) array per class, newer a (B, 7, C) array
+        if isinstance(shap_vals, list):
+            return np.stack(shap_vals, axis=1)
+        return np.transpose(shap_vals, (0, 2, 1))
+    
     def _prepare_importance_chart(self, feature_importance: Dict[str, float]) -> List[Dict[str, Any]]:
         """
         Prepare feature importance data for frontend chart
@@ -149,10 +224,14 @@ class ExplainerService:
 
 # Singleton instance
 _explainer_service = None
+_explainer_service_lock = threading.Lock()
 
 def get_explainer_service() -> ExplainerService:
     """Get or create explainer service singleton"""
     global _explainer_service
     if _explainer_service is None:
-        _explainer_service = ExplainerService()
+        # Double-checked so concurrent first requests build it only once
+        with _explainer_service_lock:
+            if _explainer_service is None:
+                _explainer_service = ExplainerService()
     return _explainer_service
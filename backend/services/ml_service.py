@@ -3,15 +3,21 @@ Machine Learning service for crop prediction
 """
 import numpy as np
 import joblib
-from typing import List, Dict, Any
-from pathlib import Path
-import sys
+import threading
+from typing import FrozenSet, List, Dict, Any, Optional
 
-# Add parent directory to path
-sys.path.append(str(Path(__file__).parent.parent))
+from ..config import Config
+from ..utils.helpers import get_top_n_predictions
+from ..utils.batching import MicroBatcher
+from ..utils.cache import LRUCache, rounded_key
+from ..utils.features import FEATURE_ORDER, check_feature_names, to_array
 
-from config import Config
-from utils.helpers import get_top_n_predictions
+# Try to import ONNX Runtime
+try:
+    import onnxruntime as ort
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
 
 class MLService:
     """Machine Learning prediction service"""
@@ -19,54 +25,104 @@ class MLService:
     def __init__(self):
         """Initialize ML service and load model"""
         self.model = None
+        self.onnx_session = None
         self.label_encoder = None
         self.feature_names = None
+        self._all_crops = []
+        self._crop_set = frozenset()
         self.load_model()
+        self._batcher = MicroBatcher(
+            self.predict_proba_batch,
+            max_batch_size=Config.BATCH_MAX_SIZE,
+            batch_wait_timeout_s=Config.BATCH_WAIT_TIMEOUT_S
+        )
+        self._proba_cache = LRUCache(maxsize=Config.CACHE_MAX_SIZE)
     
     def load_model(self):
         """Load trained model and encoders"""
         try:
-            self.model = joblib.load(Config.MODEL_PATH)
+            # Memory-map the model's arrays (requires an uncompressed dump)
+            self.model = joblib.load(Config.MODEL_PATH, mmap_mode='r')
             self.label_encoder = joblib.load(Config.LABEL_ENCODER_PATH)
             self.feature_names = joblib.load(Config.FEATURE_NAMES_PATH)
+            # Inputs are packed positionally, so catch model/schema drift now
+            check_feature_names(self.feature_names)
+            # Crop names are fixed once loaded, so build them once here
+            self._all_crops = self.label_encoder.classes_.tolist()
+            self._crop_set = frozenset(self._all_crops)
             print("✓ ML model loaded successfully")
         except FileNotFoundError as e:
             print(f"⚠️  Model not found. Please train the model first using: python scripts/train_model.py")
             raise e
+        
+        # Serve predictions from ONNX Runtime when an exported model exists;
+        # the sklearn model is still needed for SHAP and feature importance
+        if ONNX_AVAILABLE and Config.ONNX_MODEL_PATH.exists():
+            self.onnx_session = ort.InferenceSession(
+                str(Config.ONNX_MODEL_PATH), providers=['CPUExecutionProvider']
+            )
+            print("✓ ONNX inference session loaded")
+    
+    def prepare_features(self, features: Dict[str, float]) -> np.ndarray:
+        """
+        Build the model input array from a feature dictionary
+        
+        Args:
+            features: Dictionary with N, P, K, pH, temperature, humidity, rainfall
+            
+        Returns:
+            Array of shape (1, 7) in FEATURE_ORDER. The buffer is reused by
+            the next call on the same thread, so don't keep it.
+        """
+        return to_array(features)
     
-    def predict_top_crops(self, features: Dict[str, float], n: int = 3) -> List[Dict[str, Any]]:
+    def predict_top_crops(self, features: Dict[str, float], n: int = 3,
+                          feature_array: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
         """
         Predict top N crops with confidence scores
         
         Args:
             features: Dictionary with N, P, K, pH, temperature, humidity, rainfall
             n: Number of top predictions to return
+            feature_array: Optional precomputed array from prepare_features()
             
         Returns:
             List of dicts with crop name and confidence scores
         """
-        # Prepare feature array in correct order
-        feature_array = np.array([[
-            features['N'],
-            features['P'],
-            features['K'],
-            features['pH'],
-            features['temperature'],
-            features['humidity'],
-            features['rainfall']
-        ]])
+        if feature_array is None:
+            feature_array = self.prepare_features(features)
         
-        # Get probabilities for all classes
-        probabilities = self.model.predict_proba(feature_array)[0]
-        
-        # Get crop labels
-        crop_labels = self.label_encoder.classes_.tolist()
+        # Get probabilities for all classes, batched with concurrent requests
+        # and cached on the rounded inputs
+        probabilities = self._proba_cache.get_or_compute(
+            rounded_key(feature_array[0]),
+            lambda: self._batcher.run(feature_array[0])
+        )
         
         # Get top N predictions
-        top_predictions = get_top_n_predictions(probabilities, crop_labels, n)
+        top_predictions = get_top_n_predictions(probabilities, self._all_crops, n)
         
         return top_predictions
     
+    def predict_proba_batch(self, feature_matrix: np.ndarray) -> np.ndarray:
+        """
+        Predict class probabilities for a batch of feature rows
+        
+        Args:
+            feature_matrix: float32 array of shape (B, 7) in model feature order;
+                the forest compares against float32 thresholds, so other
+                dtypes would be copied
+            
+        Returns:
+            Array of shape (B, n_crops) with class probabilities
+        """
+        # No-op for the packed buffers, which are already float32
+        feature_matrix = feature_matrix.astype(np.float32, copy=False)
+        
+        if self.onnx_session is not None:
+            return self.onnx_session.run(['probabilities'], {'X': feature_matrix})[0]
+        return self.model.predict_proba(feature_matrix)
+    
     def get_feature_importance(self) -> Dict[str, float]:
         """
         Get feature importance from the model
@@ -76,26 +132,36 @@ class MLService:
         """
         importance_scores = self.model.feature_importances_
         
-        return {
-            feature: float(score) 
-            for feature, score in zip(self.feature_names, importance_scores)
-        }
+        return dict(zip(FEATURE_ORDER, importance_scores))
     
     def get_all_crops(self) -> List[str]:
         """
         Get list of all crops the model can predict
         
         Returns:
-            List of crop names
+            List of crop names (shared; don't modify it)
+        """
+        return self._all_crops
+    
+    def get_crop_set(self) -> FrozenSet[str]:
+        """
+        Get the set of crops the model can predict, for membership checks
+        
+        Returns:
+            Frozen set of crop names
         """
-        return self.label_encoder.classes_.tolist()
+        return self._crop_set
 
 # Singleton instance
 _ml_service = None
+_ml_service_lock = threading.Lock()
 
 def get_ml_service() -> MLService:
     """Get or create ML service singleton"""
     global _ml_service
     if _ml_service is None:
-        _ml_service = MLService()
+        # Double-checked so concurrent first requests build it only once
+        with _ml_service_lock:
+            if _ml_service is None:
+                _ml_service = MLService()
     return _ml_service
@@ -1,51 +1,286 @@
 """
 Sustainability analysis service
 """
-from typing import Dict, Any, List
-from pathlib import Path
-import sys
+import threading
+from dataclasses import dataclass
+from enum import IntEnum
+from functools import lru_cache
+from typing import Dict, Any, List, NamedTuple, Tuple
 
-# Add parent directory to path
-sys.path.append(str(Path(__file__).parent.parent))
+import numpy as np
+
+from ..config import Config
+
+# Try to import Numba
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit that leaves the function as plain Python"""
+        def decorator(func):
+            return func
+        return decorator
+
+# Crops with sustainability data, in label-encoder (sorted) order
+CROPS = (
+    'apple', 'banana', 'blackgram', 'chickpea', 'coconut', 'coffee', 'cotton',
+    'grapes', 'jute', 'kidneybeans', 'lentil', 'maize', 'mango', 'mothbeans',
+    'mungbean', 'muskmelon', 'orange', 'papaya', 'pigeonpeas', 'pomegranate',
+    'rice', 'watermelon'
+)
+
+# Crop name -> row in the tables below
+CROP_INDEX = {name: i for i, name in enumerate(CROPS)}
+
+# Crop nutrient consumption rates (kg/ha per season), columns N, P, K
+NPK_TABLE = np.array([
+    [130, 90, 110],   # apple
+    [200, 80, 200],   # banana
+    [30, 50, 45],     # blackgram
+    [20, 60, 40],     # chickpea (nitrogen-fixing)
+    [100, 50, 120],   # coconut
+    [100, 50, 80],    # coffee
+    [120, 60, 60],    # cotton
+    [120, 80, 150],   # grapes
+    [80, 40, 40],     # jute
+    [30, 50, 50],     # kidneybeans
+    [20, 55, 40],     # lentil
+    [150, 75, 50],    # maize
+    [150, 100, 120],  # mango
+    [30, 45, 45],     # mothbeans
+    [25, 50, 50],     # mungbean
+    [90, 55, 75],     # muskmelon
+    [140, 70, 100],   # orange
+    [110, 80, 90],    # papaya
+    [25, 50, 40],     # pigeonpeas
+    [100, 50, 100],   # pomegranate
+    [120, 60, 60],    # rice
+    [100, 60, 80]     # watermelon
+], dtype=np.int16)
+NPK_TABLE.flags.writeable = False
+
+# Water requirements (mm per season)
+WATER_TABLE = np.array([
+    800, 1500, 400, 400, 1200, 1000, 700, 900, 600, 500, 450,
+    600, 1000, 400, 350, 450, 900, 800, 450, 800, 1200, 500
+], dtype=np.int16)
+WATER_TABLE.flags.writeable = False
+
+# Fallbacks for crops without data
+DEFAULT_NPK = np.array([100, 50, 50], dtype=np.int16)
+DEFAULT_NPK.flags.writeable = False
+DEFAULT_WATER = 600
+
+# Depletion severity codes, set by _score_core() from the average depletion
+SEVERITY_NAMES = ('low', 'moderate', 'high', 'severe')
+
+class RiskLevel(IntEnum):
+    """Water risk level; RISK_NAMES gives the name used in responses"""
+    LOW = 0
+    MEDIUM = 1
+    HIGH = 2
+
+# Water risk names and score deductions, indexed by RiskLevel
+RISK_NAMES = ('low', 'medium', 'high')
+RISK_DEDUCTIONS = np.array([0, 10, 20], dtype=np.int64)
+
+# Score bonus for a near-neutral pH, GOOD_PH[0] <= pH <= GOOD_PH[1]; this
+# check is the only way pH affects the analysis
+PH_BONUS = 5
+GOOD_PH = (6.0, 7.5)
+
+# Plain-list copies of the tables for the scalar path
+_NPK_ROWS = NPK_TABLE.tolist()
+_WATER_NEEDS = WATER_TABLE.tolist()
+
+class SoilImpact(NamedTuple):
+    """Numeric sustainability analysis of one (crop, soil) pair"""
+    consumption: Tuple[int, int, int]
+    remaining: Tuple[float, float, float]
+    depletion_percent: Tuple[float, float, float]
+    severity: int
+    water_need: int
+    available_water: float
+    deficit: float
+    surplus: float
+    risk_level: RiskLevel
+    sustainability_score: int
+
+@njit(cache=True)
+def _score_core(cons_n, cons_p, cons_k, cur_n, cur_p, cur_k, rainfall, water_need, good_ph):
+    """
+    Sustainability math for one (crop, soil) pair, compiled by Numba if available
+    
+    Returns:
+        Tuple of (remaining N/P/K, clamped depletion N/P/K, severity code,
+        available water, deficit, surplus, risk level, score)
+    """
+    # Remaining nutrients after harvest
+    rem_n = max(0.0, cur_n - cons_n)
+    rem_p = max(0.0, cur_p - cons_p)
+    rem_k = max(0.0, cur_k - cons_k)
+    
+    # Depletion percentages; severity uses the unclamped values
+    raw_n = cons_n / max(cur_n, 1.0) * 100
+    raw_p = cons_p / max(cur_p, 1.0) * 100
+    raw_k = cons_k / max(cur_k, 1.0) * 100
+    
+    avg_raw = (raw_n + raw_p + raw_k) / 3
+    if avg_raw > 70:
+        severity = 3
+    elif avg_raw > 50:
+        severity = 2
+    elif avg_raw > 30:
+        severity = 1
+    else:
+        severity = 0
+    
+    dep_n = min(100.0, raw_n)
+    dep_p = min(100.0, raw_p)
+    dep_k = min(100.0, raw_k)
+    
+    # Water risk (rainfall is a monthly average, so x4 for the season)
+    available = rainfall * 4
+    deficit = max(0.0, water_need - available)
+    surplus = max(0.0, available - water_need)
+    
+    if deficit > 400:
+        risk = RiskLevel.HIGH
+    elif deficit > 200:
+        risk = RiskLevel.MEDIUM
+    elif surplus > 400:
+        risk = RiskLevel.MEDIUM
+    else:
+        risk = RiskLevel.LOW
+    
+    # Sustainability score (0-100): deduct for depletion and water risk,
+    # bonus for good pH, without branching
+    score = 100 - (dep_n + dep_p + dep_k) / 3 * 0.3 - RISK_DEDUCTIONS[risk] + PH_BONUS * good_ph
+    score = max(0, min(100, int(score)))
+    
+    return (rem_n, rem_p, rem_k, dep_n, dep_p, dep_k, severity,
+            available, deficit, surplus, risk, score)
+
+def _is_good_ph(ph: float) -> bool:
+    """Whether a soil pH earns PH_BONUS"""
+    return GOOD_PH[0] <= ph <= GOOD_PH[1]
+
+def _soil_impact(crop: str, cur_n: float, cur_p: float, cur_k: float,
+                 good_ph: bool, rainfall: float) -> SoilImpact:
+    """Run _score_core() for a lowercase crop name and soil readings"""
+    # Always pass the same types so Numba compiles a single specialization
+    idx = CROP_INDEX.get(crop, -1)
+    if idx < 0:
+        consumption = tuple(DEFAULT_NPK.tolist())
+        water_need = DEFAULT_WATER
+    else:
+        consumption = tuple(_NPK_ROWS[idx])
+        water_need = _WATER_NEEDS[idx]
+    
+    (rem_n, rem_p, rem_k, dep_n, dep_p, dep_k, severity,
+     available, deficit, surplus, risk, score) = _score_core(
+        float(consumption[0]), float(consumption[1]), float(consumption[2]),
+        float(cur_n), float(cur_p), float(cur_k), float(rainfall), float(water_need), bool(good_ph)
+    )
+    
+    return SoilImpact(
+        consumption=consumption,
+        remaining=(rem_n, rem_p, rem_k),
+        depletion_percent=(dep_n, dep_p, dep_k),
+        severity=severity,
+        water_need=water_need,
+        available_water=available,
+        deficit=deficit,
+        surplus=surplus,
+        risk_level=RiskLevel(risk),
+        sustainability_score=score
+    )
+
+@dataclass(frozen=True, slots=True)
+class NutrientDepletion:
+    """Nutrient depletion part of a sustainability analysis, N/P/K ordered"""
+    consumption: Tuple[int, int, int]
+    remaining: Tuple[float, float, float]
+    depletion_percent: Tuple[float, float, float]
+    severity: str
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Build the nutrient depletion response"""
+        n_cons, p_cons, k_cons = self.consumption
+        n_rem, p_rem, k_rem = self.remaining
+        n_dep, p_dep, k_dep = self.depletion_percent
+        
+        return {
+            'consumption': {'N': n_cons, 'P': p_cons, 'K': k_cons},
+            'remaining': {'N': n_rem, 'P': p_rem, 'K': k_rem},
+            'depletion_percent': {'N': n_dep, 'P': p_dep, 'K': k_dep},
+            'severity': self.severity
+        }
+
+@dataclass(frozen=True, slots=True)
+class WaterRisk:
+    """Water risk part of a sustainability analysis"""
+    water_need: int
+    available_water: float
+    deficit: float
+    surplus: float
+    risk_level: str
+    message: str
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Build the water risk response"""
+        return {
+            'water_need': self.water_need,
+            'available_water': self.available_water,
+            'deficit': self.deficit,
+            'surplus': self.surplus,
+            'risk_level': self.risk_level,
+            'message': self.message
+        }
+
+@dataclass(frozen=True, slots=True)
+class SoilAnalysis:
+    """Cached analysis of one (crop, soil) pair, shared between requests"""
+    impact: SoilImpact
+    nutrient_depletion: NutrientDepletion
+    water_risk: WaterRisk
+    recommendations: Tuple[str, ...]
+
+@dataclass(frozen=True, slots=True)
+class SustainabilityReport:
+    """Full sustainability analysis for one request"""
+    crop: str
+    analysis: SoilAnalysis
+    crop_rotation: Dict[str, Any]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Build the response, allocating fresh dicts for the shared analysis"""
+        analysis = self.analysis
+        return {
+            'crop': self.crop,
+            'sustainability_score': analysis.impact.sustainability_score,
+            'nutrient_depletion': analysis.nutrient_depletion.to_dict(),
+            'water_risk': analysis.water_risk.to_dict(),
+            'crop_rotation': self.crop_rotation,
+            'recommendations': list(analysis.recommendations)
+        }
 
 class SustainabilityService:
     """Service for analyzing crop sustainability and soil impact"""
     
-    # Crop nutrient consumption rates (kg/ha per season)
-    CROP_NPK_CONSUMPTION = {
-        'rice': {'N': 120, 'P': 60, 'K': 60},
-        'maize': {'N': 150, 'P': 75, 'K': 50},
-        'chickpea': {'N': 20, 'P': 60, 'K': 40},  # Nitrogen-fixing
-        'kidneybeans': {'N': 30, 'P': 50, 'K': 50},
-        'pigeonpeas': {'N': 25, 'P': 50, 'K': 40},
-        'mothbeans': {'N': 30, 'P': 45, 'K': 45},
-        'mungbean': {'N': 25, 'P': 50, 'K': 50},
-        'blackgram': {'N': 30, 'P': 50, 'K': 45},
-        'lentil': {'N': 20, 'P': 55, 'K': 40},
-        'pomegranate': {'N': 100, 'P': 50, 'K': 100},
-        'banana': {'N': 200, 'P': 80, 'K': 200},
-        'mango': {'N': 150, 'P': 100, 'K': 120},
-        'grapes': {'N': 120, 'P': 80, 'K': 150},
-        'watermelon': {'N': 100, 'P': 60, 'K': 80},
-        'muskmelon': {'N': 90, 'P': 55, 'K': 75},
-        'apple': {'N': 130, 'P': 90, 'K': 110},
-        'orange': {'N': 140, 'P': 70, 'K': 100},
-        'papaya': {'N': 110, 'P': 80, 'K': 90},
-        'coconut': {'N': 100, 'P': 50, 'K': 120},
-        'cotton': {'N': 120, 'P': 60, 'K': 60},
-        'jute': {'N': 80, 'P': 40, 'K': 40},
-        'coffee': {'N': 100, 'P': 50, 'K': 80}
-    }
+    # Nitrogen-fixing crops for rotation
+    NITROGEN_FIXERS = ('chickpea', 'pigeonpeas', 'lentil', 'mungbean', 'blackgram')
+    
+    # Light feeders
+    LIGHT_FEEDERS = ('mothbeans', 'jute', 'watermelon', 'muskmelon')
     
-    # Water requirements (mm per season)
-    CROP_WATER_NEEDS = {
-        'rice': 1200, 'maize': 600, 'chickpea': 400, 'kidneybeans': 500,
-        'pigeonpeas': 450, 'mothbeans': 400, 'mungbean': 350, 'blackgram': 400,
-        'lentil': 450, 'pomegranate': 800, 'banana': 1500, 'mango': 1000,
-        'grapes': 900, 'watermelon': 500, 'muskmelon': 450, 'apple': 800,
-        'orange': 900, 'papaya': 800, 'coconut': 1200, 'cotton': 700,
-        'jute': 600, 'coffee': 1000
-    }
+    def __init__(self):
+        """Initialize sustainability service"""
+        # Compile the numeric core now rather than on the first request
+        self.analyze_soil_impact_compact('rice', {})
     
     def analyze_soil_impact(self, crop: str, soil_params: Dict[str, float], 
                            duration_months: int = 4) -> Dict[str, Any]:
@@ -60,127 +295,140 @@ class SustainabilityService:
         Returns:
             Dictionary with sustainability analysis
         """
-        crop_lower = crop.lower()
+        return self.analyze_soil_impact_report(crop, soil_params, duration_months).to_dict()
+    
+    def analyze_soil_impact_report(self, crop: str, soil_params: Dict[str, float],
+                                   duration_months: int = 4) -> SustainabilityReport:
+        """
+        Analyze sustainability impact of growing a crop, without building dicts
         
-        # Calculate nutrient depletion
-        depletion = self._calculate_nutrient_depletion(crop_lower, soil_params)
+        Args:
+            crop: Crop name
+            soil_params: Current soil parameters (N, P, K, pH)
+            duration_months: Growing duration in months
+            
+        Returns:
+            SustainabilityReport; call to_dict() for the response form
+        """
+        crop_lower = crop.lower()
         
-        # Calculate water risk
-        water_risk = self._calculate_water_risk(crop_lower, soil_params.get('rainfall', 0))
+        # Key the cache on the exact readings (as floats, so 90 and 90.0
+        # share an entry) and reduce pH to the bonus check, its only effect
+        analysis = self._analyze_core(
+            crop_lower,
+            float(soil_params.get('N', 50)),
+            float(soil_params.get('P', 50)),
+            float(soil_params.get('K', 50)),
+            _is_good_ph(soil_params.get('pH', 7)),
+            float(soil_params.get('rainfall', 0))
+        )
         
         # Get crop rotation suggestions
-        rotation = self._suggest_crop_rotation(crop_lower, depletion)
-        
-        # Calculate overall sustainability score
-        sustainability_score = self._calculate_sustainability_score(
-            depletion, water_risk, soil_params
-        )
+        rotation = self._suggest_crop_rotation(crop_lower, analysis.nutrient_depletion)
         
-        return {
-            'crop': crop,
-            'sustainability_score': sustainability_score,
-            'nutrient_depletion': depletion,
-            'water_risk': water_risk,
-            'crop_rotation': rotation,
-            'recommendations': self._generate_recommendations(
-                crop_lower, depletion, water_risk, sustainability_score
-            )
-        }
+        return SustainabilityReport(crop, analysis, rotation)
     
-    def _calculate_nutrient_depletion(self, crop: str, soil_params: Dict[str, float]) -> Dict[str, Any]:
-        """Calculate nutrient depletion estimates"""
-        
-        consumption = self.CROP_NPK_CONSUMPTION.get(crop, {'N': 100, 'P': 50, 'K': 50})
-        
-        current_n = soil_params.get('N', 50)
-        current_p = soil_params.get('P', 50)
-        current_k = soil_params.get('K', 50)
-        
-        # Calculate remaining nutrients after harvest
-        remaining_n = max(0, current_n - consumption['N'])
-        remaining_p = max(0, current_p - consumption['P'])
-        remaining_k = max(0, current_k - consumption['K'])
-        
-        # Calculate depletion percentages
-        n_depletion = (consumption['N'] / max(current_n, 1)) * 100
-        p_depletion = (consumption['P'] / max(current_p, 1)) * 100
-        k_depletion = (consumption['K'] / max(current_k, 1)) * 100
+    @classmethod
+    @lru_cache(maxsize=Config.CACHE_MAX_SIZE)
+    def _analyze_core(cls, crop: str, n: float, p: float, k: float, good_ph: bool,
+                      rainfall: float) -> SoilAnalysis:
+        """
+        Analyze a lowercase crop name and soil readings, memoized
         
-        return {
-            'consumption': consumption,
-            'remaining': {'N': remaining_n, 'P': remaining_p, 'K': remaining_k},
-            'depletion_percent': {
-                'N': min(100, n_depletion),
-                'P': min(100, p_depletion),
-                'K': min(100, k_depletion)
-            },
-            'severity': self._get_depletion_severity(n_depletion, p_depletion, k_depletion)
-        }
+        Args:
+            crop: Lowercase crop name
+            n, p, k: Soil nutrients (kg/ha)
+            good_ph: Whether the soil pH is in the GOOD_PH range
+            rainfall: Monthly rainfall (mm)
+            
+        Returns:
+            Frozen SoilAnalysis, safe to share between callers
+        """
+        impact = _soil_impact(crop, n, p, k, good_ph, rainfall)
+        return SoilAnalysis(
+            impact,
+            cls._nutrient_depletion(impact),
+            cls._water_risk(impact),
+            tuple(cls._generate_recommendations(impact))
+        )
     
-    def _calculate_water_risk(self, crop: str, rainfall: float) -> Dict[str, Any]:
-        """Calculate water usage risk"""
-        
-        water_need = self.CROP_WATER_NEEDS.get(crop, 600)
-        
-        # Assume rainfall is monthly average, multiply by 4 for season
-        seasonal_rainfall = rainfall * 4
-        
-        water_deficit = max(0, water_need - seasonal_rainfall)
-        water_surplus = max(0, seasonal_rainfall - water_need)
+    def analyze_soil_impact_compact(self, crop: str, soil_params: Dict[str, float]) -> SoilImpact:
+        """
+        Compute the numeric part of the analysis without building response dicts
         
-        # Calculate risk level
-        if water_deficit > 400:
-            risk_level = 'high'
-            risk_message = f'Significant irrigation needed ({water_deficit:.0f}mm deficit)'
-        elif water_deficit > 200:
-            risk_level = 'medium'
-            risk_message = f'Moderate irrigation required ({water_deficit:.0f}mm deficit)'
-        elif water_surplus > 400:
-            risk_level = 'medium'
-            risk_message = f'Excess water may cause issues ({water_surplus:.0f}mm surplus)'
+        Args:
+            crop: Crop name
+            soil_params: Current soil parameters (N, P, K, pH, rainfall)
+            
+        Returns:
+            SoilImpact with severity as a code into SEVERITY_NAMES
+        """
+        return _soil_impact(
+            crop.lower(),
+            soil_params.get('N', 50),
+            soil_params.get('P', 50),
+            soil_params.get('K', 50),
+            _is_good_ph(soil_params.get('pH', 7)),
+            soil_params.get('rainfall', 0)
+        )
+    
+    @staticmethod
+    def _nutrient_depletion(impact: SoilImpact) -> NutrientDepletion:
+        """Build the nutrient depletion result from a SoilImpact"""
+        return NutrientDepletion(
+            impact.consumption,
+            impact.remaining,
+            impact.depletion_percent,
+            SEVERITY_NAMES[impact.severity]
+        )
+    
+    @staticmethod
+    def _water_risk(impact: SoilImpact) -> WaterRisk:
+        """Build the water risk result from a SoilImpact"""
+        deficit = impact.deficit
+        surplus = impact.surplus
+        
+        if impact.risk_level == RiskLevel.HIGH:
+            risk_message = f'Significant irrigation needed ({deficit:.0f}mm deficit)'
+        elif impact.risk_level == RiskLevel.MEDIUM and deficit > 200:
+            risk_message = f'Moderate irrigation required ({deficit:.0f}mm deficit)'
+        elif impact.risk_level == RiskLevel.MEDIUM:
+            risk_message = f'Excess water may cause issues ({surplus:.0f}mm surplus)'
         else:
-            risk_level = 'low'
             risk_message = 'Water availability is adequate'
         
-        return {
-            'water_need': water_need,
-            'available_water': seasonal_rainfall,
-            'deficit': water_deficit,
-            'surplus': water_surplus,
-            'risk_level': risk_level,
-            'message': risk_message
-        }
+        return WaterRisk(
+            impact.water_need,
+            impact.available_water,
+            deficit,
+            surplus,
+            RISK_NAMES[impact.risk_level],
+            risk_message
+        )
     
-    def _suggest_crop_rotation(self, current_crop: str, depletion: Dict[str, Any]) -> Dict[str, Any]:
+    def _suggest_crop_rotation(self, current_crop: str, depletion: NutrientDepletion) -> Dict[str, Any]:
         """Suggest crop rotation for soil recovery"""
-        
-        # Nitrogen-fixing crops for rotation
-        nitrogen_fixers = ['chickpea', 'pigeonpeas', 'lentil', 'mungbean', 'blackgram']
-        
-        # Light feeders
-        light_feeders = ['mothbeans', 'jute', 'watermelon', 'muskmelon']
-        
         suggestions = []
         
         # If high nitrogen depletion, suggest nitrogen-fixing crops
-        if depletion['depletion_percent']['N'] > 60:
+        if depletion.depletion_percent[0] > 60:
             suggestions.append({
                 'reason': 'High nitrogen depletion',
-                'crops': nitrogen_fixers,
+                'crops': self.NITROGEN_FIXERS,
                 'benefit': 'These crops will restore nitrogen to the soil'
             })
         
         # If overall high depletion, suggest light feeders
-        avg_depletion = sum(depletion['depletion_percent'].values()) / 3
+        avg_depletion = sum(depletion.depletion_percent) / 3
         if avg_depletion > 50:
             suggestions.append({
                 'reason': 'Overall nutrient depletion',
-                'crops': light_feeders,
+                'crops': self.LIGHT_FEEDERS,
                 'benefit': 'These crops have lower nutrient requirements'
             })
         
         # Suggest fallow period if severe depletion
-        if depletion['severity'] == 'severe':
+        if depletion.severity == 'severe':
             suggestions.append({
                 'reason': 'Severe soil depletion',
                 'crops': ['fallow period with cover crops'],
@@ -196,67 +444,30 @@ class SustainabilityService:
             }]
         }
     
-    def _calculate_sustainability_score(self, depletion: Dict[str, Any], 
-                                       water_risk: Dict[str, Any],
-                                       soil_params: Dict[str, float]) -> int:
-        """Calculate overall sustainability score (0-100)"""
-        
-        score = 100
-        
-        # Deduct for nutrient depletion
-        avg_depletion = sum(depletion['depletion_percent'].values()) / 3
-        score -= avg_depletion * 0.3
-        
-        # Deduct for water risk
-        if water_risk['risk_level'] == 'high':
-            score -= 20
-        elif water_risk['risk_level'] == 'medium':
-            score -= 10
-        
-        # Bonus for good pH
-        pH = soil_params.get('pH', 7)
-        if 6.0 <= pH <= 7.5:
-            score += 5
-        
-        return max(0, min(100, int(score)))
-    
-    def _get_depletion_severity(self, n_dep: float, p_dep: float, k_dep: float) -> str:
-        """Determine depletion severity level"""
-        avg_depletion = (n_dep + p_dep + k_dep) / 3
-        
-        if avg_depletion > 70:
-            return 'severe'
-        elif avg_depletion > 50:
-            return 'high'
-        elif avg_depletion > 30:
-            return 'moderate'
-        else:
-            return 'low'
-    
-    def _generate_recommendations(self, crop: str, depletion: Dict[str, Any],
-                                 water_risk: Dict[str, Any], 
-                                 score: int) -> List[str]:
+    @staticmethod
+    def _generate_recommendations(impact: SoilImpact) -> List[str]:
         """Generate actionable sustainability recommendations"""
         
         recommendations = []
+        n_dep, p_dep, k_dep = impact.depletion_percent
         
         # Nutrient recommendations
-        if depletion['depletion_percent']['N'] > 50:
+        if n_dep > 50:
             recommendations.append('Apply nitrogen-rich fertilizers or compost before next planting')
-        if depletion['depletion_percent']['P'] > 50:
+        if p_dep > 50:
             recommendations.append('Add phosphate fertilizers to restore phosphorus levels')
-        if depletion['depletion_percent']['K'] > 50:
+        if k_dep > 50:
             recommendations.append('Use potash or wood ash to replenish potassium')
         
         # Water recommendations
-        if water_risk['risk_level'] == 'high':
+        if impact.risk_level == RiskLevel.HIGH:
             recommendations.append('Install drip irrigation system to conserve water')
             recommendations.append('Use mulching to reduce water evaporation')
-        elif water_risk['surplus'] > 300:
+        elif impact.surplus > 300:
             recommendations.append('Ensure proper drainage to prevent waterlogging')
         
         # General sustainability
-        if score < 60:
+        if impact.sustainability_score < 60:
             recommendations.append('Consider crop rotation to improve soil health')
             recommendations.append('Add organic matter to enhance soil structure')
         
@@ -267,10 +478,14 @@ class SustainabilityService:
 
 # Singleton instance
 _sustainability_service = None
+_sustainability_service_lock = threading.Lock()
 
 def get_sustainability_service() -> SustainabilityService:
     """Get or create sustainability service singleton"""
     global _sustainability_service
     if _sustainability_service is None:
-        _sustainability_service = SustainabilityService()
+        # Double-checked so concurrent first requests build it only once
+        with _sustainability_service_lock:
+            if _sustainability_service is None:
+                _sustainability_service = SustainabilityService()
     return _sustainability_service
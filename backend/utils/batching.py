@@ -0,0 +1,89 @@
+"""
+Request batching utilities for AgroMind AI
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Sequence
+
+import numpy as np
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-row requests into one vectorized call
+
+    Callers submit one feature row at a time. A background thread drains up
+    to ``max_batch_size`` rows, waiting at most ``batch_wait_timeout_s`` for
+    more to arrive, runs ``batch_fn`` once on the stacked ``(B, F)`` array and
+    hands row ``i`` of its output back to the ``i``-th caller.
+    """
+
+    def __init__(self, batch_fn: Callable[[np.ndarray], Sequence[Any]],
+                 max_batch_size: int = 32, batch_wait_timeout_s: float = 0.01):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.batch_wait_timeout_s = batch_wait_timeout_s
+        self._lock = threading.Lock()
+        self._queue = None
+        self._pid = None
+
+    def submit(self, row: np.ndarray) -> Future:
+        """
+        Queue a single feature row for the next batch
+
+        Args:
+            row: 1D feature array
+
+        Returns:
+            Future resolving to this row's slice of the batch output
+        """
+        future = Future()
+        self._get_queue().put((row, future))
+        return future
+
+    def run(self, row: np.ndarray) -> Any:
+        """Submit a row and block until its result is ready"""
+        return self.submit(row).result()
+
+    def _get_queue(self) -> queue.Queue:
+        """Return this process's queue, starting the worker thread if needed"""
+        # Threads don't survive fork, so each gunicorn worker starts its own
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    self._queue = queue.Queue()
+                    threading.Thread(
+                        target=self._worker, args=(self._queue,),
+                        name='micro-batcher', daemon=True
+                    ).start()
+                    self._pid = pid
+        return self._queue
+
+    def _worker(self, requests: queue.Queue):
+        """Drain queued rows into batches forever"""
+        while True:
+            batch = [requests.get()]
+            deadline = time.monotonic() + self.batch_wait_timeout_s
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            rows, futures = zip(*batch)
+            try:
+                results = self.batch_fn(np.vstack(rows))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            for future, result in zip(futures, results):
+                future.set_result(result)
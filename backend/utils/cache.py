@@ -0,0 +1,100 @@
+"""
+In-process caching utilities for AgroMind AI
+"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Iterable, Tuple
+
+def rounded_key(values: Iterable[float], ndigits: int = 2) -> Tuple[float, ...]:
+    """
+    Build a hashable cache key from numeric feature values
+
+    Args:
+        values: Feature values in a fixed order
+        ndigits: Decimal places kept, so near-identical inputs share a key
+
+    Returns:
+        Tuple of rounded floats
+    """
+    return tuple(round(float(value), ndigits) for value in values)
+
+class LRUCache:
+    """
+    Thread-safe LRU cache that coalesces concurrent misses
+
+    While a value is being computed, other callers asking for the same key
+    wait on the owner's Future instead of triggering a second computation.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def claim(self, key: Hashable) -> Tuple[Future, bool]:
+        """
+        Look up a key, registering the caller as its owner on a cold miss
+
+        Args:
+            key: Hashable cache key
+
+        Returns:
+            Tuple of (future, is_owner). The owner must compute the value and
+            call resolve() or fail(); everyone else just waits on the future.
+        """
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                future = Future()
+                future.set_result(self._data[key])
+                return future, False
+
+            future = self._inflight.get(key)
+            if future is not None:
+                return future, False
+
+            future = Future()
+            self._inflight[key] = future
+            return future, True
+
+    def resolve(self, key: Hashable, value: Any, store: bool = True):
+        """Publish the owner's value to waiters, caching it unless store is False"""
+        with self._lock:
+            future = self._inflight.pop(key)
+            if store:
+                self._data[key] = value
+                if len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+        future.set_result(value)
+
+    def fail(self, key: Hashable, error: BaseException):
+        """Propagate the owner's error to waiters without caching anything"""
+        with self._lock:
+            future = self._inflight.pop(key)
+        future.set_exception(error)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for key, computing it at most once on a miss
+
+        Args:
+            key: Hashable cache key
+            compute: Zero-argument callable producing the value
+
+        Returns:
+            Cached or freshly computed value
+        """
+        future, is_owner = self.claim(key)
+        if not is_owner:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            self.fail(key, e)
+            raise
+
+        self.resolve(key, value)
+        return value
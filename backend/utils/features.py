@@ -0,0 +1,66 @@
+"""
+Model input packing utilities for AgroMind AI
+"""
+import threading
+from typing import Dict, Iterable
+
+import numpy as np
+
+from ..config import Config
+
+# Column order of every model input array
+FEATURE_ORDER = Config.FEATURE_ORDER
+
+# Per-thread (1, 7) model input buffer, reused across requests
+_buf = threading.local()
+
+def pack(features: Dict[str, float], out: np.ndarray, row: int = 0) -> np.ndarray:
+    """
+    Write a feature dictionary into one row of a model input array
+
+    Args:
+        features: Dictionary with N, P, K, pH, temperature, humidity, rainfall
+        out: Array of shape (B, 7) to fill
+        row: Row of ``out`` to write
+
+    Returns:
+        ``out``, for chaining
+    """
+    dest = out[row]
+    for i, name in enumerate(FEATURE_ORDER):
+        dest[i] = features[name]
+    return out
+
+def to_array(features: Dict[str, float]) -> np.ndarray:
+    """
+    Pack a feature dictionary into this thread's reusable input buffer
+
+    Args:
+        features: Dictionary with N, P, K, pH, temperature, humidity, rainfall
+
+    Returns:
+        Array of shape (1, 7) in FEATURE_ORDER. The buffer is reused by the
+        next call on the same thread, so don't keep it.
+    """
+    arr = getattr(_buf, 'arr', None)
+    if arr is None:
+        arr = _buf.arr = np.empty((1, len(FEATURE_ORDER)), dtype=np.float32)
+    return pack(features, arr)
+
+def check_feature_names(feature_names: Iterable[str]):
+    """
+    Make sure a trained model expects its inputs in FEATURE_ORDER
+
+    Args:
+        feature_names: Column names the model was trained on
+
+    Raises:
+        ValueError: If the names or their order differ (case-insensitively)
+    """
+    trained = [name.lower() for name in feature_names]
+    expected = [name.lower() for name in FEATURE_ORDER]
+    if trained != expected:
+        raise ValueError(
+            f"Model was trained on features {list(feature_names)}, "
+            f"but inputs are packed as {list(FEATURE_ORDER)}"
+        )
@@ -0,0 +1,28 @@
+"""
+JSON serialization for Flask responses using orjson
+"""
+from typing import Any, Union
+
+import orjson
+from flask.json.provider import JSONProvider
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson, with native NumPy support"""
+    
+    # NumPy arrays and scalars (e.g. SHAP values) serialize without float() casts
+    option = orjson.OPT_SERIALIZE_NUMPY
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """Serialize data as a JSON string"""
+        return orjson.dumps(obj, option=self.option).decode()
+    
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        """Deserialize data from a JSON string or bytes"""
+        return orjson.loads(s)
+    
+    def response(self, *args: Any, **kwargs: Any):
+        """Build a JSON response, writing orjson's bytes directly to the body"""
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, option=self.option), mimetype='application/json'
+        )
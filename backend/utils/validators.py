@@ -1,13 +1,94 @@
 """
 Input validation utilities for AgroMind AI
 """
-from typing import Dict, Tuple, Any
-from config import Config
+import json
+import numpy as np
+from typing import Collection, Dict, Tuple, Any, Optional
+from ..config import Config
+
+# Try to import msgspec
+try:
+    import msgspec
+    from typing import Annotated
+    MSGSPEC_AVAILABLE = True
+except ImportError:
+    MSGSPEC_AVAILABLE = False
 
 class ValidationError(Exception):
     """Custom validation error"""
     pass
 
+# Soil/climate fields and their valid ranges as arrays, for vectorized checks
+FIELDS = ('N', 'P', 'K', 'pH', 'temperature', 'humidity', 'rainfall')
+LOW = np.array([Config.FEATURE_RANGES[field][0] for field in FIELDS], dtype=np.float64)
+HIGH = np.array([Config.FEATURE_RANGES[field][1] for field in FIELDS], dtype=np.float64)
+
+if MSGSPEC_AVAILABLE:
+    def _ranged(field: str):
+        """Float type constrained to the field's Config.FEATURE_RANGES bounds"""
+        min_val, max_val = Config.FEATURE_RANGES[field]
+        return Annotated[float, msgspec.Meta(ge=min_val, le=max_val)]
+    
+    class SoilClimateInput(msgspec.Struct):
+        """Soil/climate request body, decoded and range-checked in one pass"""
+        N: _ranged('N')
+        P: _ranged('P')
+        K: _ranged('K')
+        pH: _ranged('pH')
+        temperature: _ranged('temperature')
+        humidity: _ranged('humidity')
+        rainfall: _ranged('rainfall')
+        crop: Optional[str] = None
+        location: Optional[str] = None
+        duration_months: int = 4
+
+def decode_soil_climate_input(body: bytes) -> Tuple[Optional[Dict[str, Any]], str]:
+    """
+    Decode and validate a soil/climate JSON request body
+    
+    Uses msgspec to parse, coerce and range-check the raw bytes in one pass
+    when it is installed, and falls back to sanitize_input() and
+    validate_soil_climate_input() otherwise. Invalid bodies always go
+    through the fallback, so error messages keep its per-field wording.
+    
+    Args:
+        body: Raw request body
+        
+    Returns:
+        Tuple of (payload, error_message). The payload holds the seven
+        features as floats plus the optional crop, location and
+        duration_months fields; it is None when validation fails.
+    """
+    if not body:
+        return None, "No data provided"
+    
+    if MSGSPEC_AVAILABLE:
+        try:
+            payload = msgspec.json.decode(body, type=SoilClimateInput, strict=False)
+            return msgspec.structs.asdict(payload), ""
+        except msgspec.ValidationError:
+            # Re-check below for a message the frontend can show as-is
+            pass
+        except msgspec.DecodeError:
+            return None, "Request body must be valid JSON"
+    
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None, "Request body must be valid JSON"
+    if not data or not isinstance(data, dict):
+        return None, "No data provided"
+    
+    payload = sanitize_input({k: v for k, v in data.items() if k not in ('crop', 'location')})
+    is_valid, error_msg = validate_soil_climate_input(payload)
+    if not is_valid:
+        return None, error_msg
+    
+    payload['crop'] = data.get('crop')
+    payload['location'] = data.get('location')
+    payload.setdefault('duration_months', 4)
+    return payload, ""
+
 def validate_soil_climate_input(data: Dict[str, Any]) -> Tuple[bool, str]:
     """
     Validate soil and climate input parameters
@@ -18,15 +99,26 @@ def validate_soil_climate_input(data: Dict[str, Any]) -> Tuple[bool, str]:
     Returns:
         Tuple of (is_valid, error_message)
     """
-    required_fields = ['N', 'P', 'K', 'pH', 'temperature', 'humidity', 'rainfall']
-    
     # Check all required fields present
-    missing_fields = [field for field in required_fields if field not in data]
+    missing_fields = [field for field in FIELDS if field not in data]
     if missing_fields:
         return False, f"Missing required fields: {', '.join(missing_fields)}"
     
-    # Validate each field is numeric and within range
-    for field in required_fields:
+    # Cast and range-check all fields at once; NaN (e.g. from None) fails
+    # the comparison too
+    try:
+        values = np.array([data[field] for field in FIELDS], dtype=np.float64)
+    except (ValueError, TypeError):
+        values = None
+    
+    if values is not None and ((values >= LOW) & (values <= HIGH)).all():
+        return True, ""
+    
+    return _field_error(data)
+
+def _field_error(data: Dict[str, Any]) -> Tuple[bool, str]:
+    """Find the first invalid field and describe it (slow path for bad input)"""
+    for field in FIELDS:
         value = data[field]
         
         # Check if numeric
@@ -43,13 +135,13 @@ def validate_soil_climate_input(data: Dict[str, Any]) -> Tuple[bool, str]:
     
     return True, ""
 
-def validate_crop_name(crop: str, valid_crops: list) -> Tuple[bool, str]:
+def validate_crop_name(crop: str, valid_crops: Collection[str]) -> Tuple[bool, str]:
     """
     Validate crop name against known crops
     
     Args:
         crop: Crop name to validate
-        valid_crops: List of valid crop names
+        valid_crops: Valid crop names (pass a set for O(1) lookups)
         
     Returns:
         Tuple of (is_valid, error_message)
@@ -58,7 +150,7 @@ def validate_crop_name(crop: str, valid_crops: list) -> Tuple[bool, str]:
         return False, "Crop name is required"
     
     if crop not in valid_crops:
-        return False, f"Unknown crop: {crop}. Valid crops: {', '.join(valid_crops[:10])}..."
+        return False, f"Unknown crop: {crop}. Valid crops: {', '.join(sorted(valid_crops)[:10])}..."
     
     return True, ""
 
@@ -70,13 +162,18 @@ def sanitize_input(data: Dict[str, Any]) -> Dict[str, float]:
         data: Raw input data
         
     Returns:
-        Sanitized data with float values
+        Sanitized data with float values; values that can't be converted
+        are kept as they are
     """
-    sanitized = {}
-    for key, value in data.items():
-        try:
-            sanitized[key] = float(value)
-        except (ValueError, TypeError):
-            sanitized[key] = value
-    
-    return sanitized
+    # Fast path: every value converts, so no per-key exception handling
+    try:
+        return {key: float(value) for key, value in data.items()}
+    except (ValueError, TypeError):
+        return {key: _coerce_float(value) for key, value in data.items()}
+
+def _coerce_float(value: Any) -> Any:
+    """Convert a value to float, or return it unchanged if it can't be"""
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return value
@@ -0,0 +1,17 @@
+"""
+WSGI entrypoint for AgroMind AI
+
+Run from the repository root with:
+    gunicorn -c backend/gunicorn.conf.py backend.wsgi:app
+"""
+import gc
+
+from .app import create_app
+
+# create_app() loads the model and SHAP explainer, so with preload_app this
+# happens once in the gunicorn master before the workers fork
+app = create_app()
+
+# Move everything loaded so far out of the GC's reach so collections in the
+# workers don't touch (and un-share) the preloaded model's pages
+gc.freeze()
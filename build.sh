@@ -8,7 +8,7 @@ echo "🚀 Starting build process..."
 echo "📦 Installing Python dependencies..."
 pip install -r backend/requirements.txt
 
-# Train the ML model
+# Train the ML model (also exports it to ONNX)
 echo "🤖 Training ML model..."
 python scripts/train_model.py
 
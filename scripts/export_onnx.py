@@ -0,0 +1,41 @@
+"""
+Export the trained RandomForest model to ONNX for fast inference
+
+train_model.py exports automatically; run this to re-export an existing
+pickle without retraining.
+"""
+import joblib
+import sys
+from pathlib import Path
+
+from skl2onnx import convert_sklearn
+from skl2onnx.common.data_types import FloatTensorType
+
+# Repository root, so the backend package is importable
+_PARENT = str(Path(__file__).resolve().parent.parent)
+if _PARENT not in sys.path:
+    sys.path.insert(0, _PARENT)
+
+from backend.config import Config
+
+def export_onnx(model, n_features: int = 7):
+    """Convert a fitted sklearn classifier to an ONNX model"""
+    return convert_sklearn(
+        model,
+        initial_types=[('X', FloatTensorType([None, n_features]))],
+        # Emit probabilities as a plain (B, C) tensor instead of a list of dicts
+        options={id(model): {'zipmap': False}}
+    )
+
+def main():
+    """Export the saved model next to its pickle"""
+    print("📦 Exporting model to ONNX...")
+    
+    model = joblib.load(Config.MODEL_PATH)
+    onnx_model = export_onnx(model, model.n_features_in_)
+    Config.ONNX_MODEL_PATH.write_bytes(onnx_model.SerializeToString())
+    
+    print(f"✓ ONNX model saved to: {Config.ONNX_MODEL_PATH}")
+
+if __name__ == "__main__":
+    main()
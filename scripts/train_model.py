@@ -8,20 +8,55 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import LabelEncoder
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 import joblib
+from threadpoolctl import threadpool_limits
+import argparse
 import sys
 from pathlib import Path
 
-# Add parent directory to path
-sys.path.append(str(Path(__file__).parent.parent))
+# Try to import Intel's scikit-learn extension (oneDAL-backed estimators)
+try:
+    from sklearnex.ensemble import RandomForestClassifier as OneDALRandomForestClassifier
+    SKLEARNEX_AVAILABLE = True
+except ImportError:
+    SKLEARNEX_AVAILABLE = False
+
+# Try to import the ONNX exporter (needs skl2onnx)
+try:
+    from export_onnx import export_onnx
+    ONNX_EXPORT_AVAILABLE = True
+except ImportError:
+    ONNX_EXPORT_AVAILABLE = False
+
+# Repository root, so the backend package is importable
+_PARENT = str(Path(__file__).resolve().parent.parent)
+if _PARENT not in sys.path:
+    sys.path.insert(0, _PARENT)
 
 from backend.config import Config
 
+# Dataset column types, so pandas parses each column once without inferring
+DATASET_DTYPES = {
+    'N': np.float32,
+    'P': np.float32,
+    'K': np.float32,
+    'temperature': np.float32,
+    'humidity': np.float32,
+    'ph': np.float32,
+    'rainfall': np.float32,
+    'label': 'category'
+}
+
 def load_data():
     """Load crop dataset"""
     print("📊 Loading dataset...")
     # Use custom dataset from dataset folder
-    dataset_path = Path(__file__).parent.parent / 'dataset' / 'Crop_recommendation.csv'
-    df = pd.read_csv(dataset_path)
+    dataset_path = Path(_PARENT) / 'dataset' / 'Crop_recommendation.csv'
+    df = pd.read_csv(
+        dataset_path,
+        usecols=list(DATASET_DTYPES),
+        dtype=DATASET_DTYPES,
+        engine='c'
+    )
     
     # Rename 'label' column to 'crop' for consistency
     if 'label' in df.columns:
@@ -35,8 +70,10 @@ def preprocess_data(df):
     """Preprocess data for training"""
     print("\n🔧 Preprocessing data...")
     
-    # Separate features and target
-    X = df.drop('crop', axis=1)
+    # Separate features and target; the forest splits on float32 anyway,
+    # so fitting on float32 avoids an internal float64 -> float32 copy
+    X = df.drop('crop', axis=1).astype(np.float32, copy=False)
+    assert X.dtypes.eq(np.float32).all()
     y = df['crop']
     
     # Encode crop labels
@@ -51,10 +88,20 @@ def preprocess_data(df):
     
     return X, y_encoded, label_encoder, feature_names
 
-def train_model(X, y):
+def train_model(X, y, use_sklearnex=False):
     """Train RandomForest classifier"""
     print("\n🤖 Training RandomForest model...")
     
+    # oneDAL's RandomForest is a drop-in subclass with SIMD histogram splits,
+    # but the saved model then needs sklearnex installed wherever it's loaded
+    estimator = RandomForestClassifier
+    if use_sklearnex:
+        if SKLEARNEX_AVAILABLE:
+            estimator = OneDALRandomForestClassifier
+            print("✓ Using scikit-learn-intelex (oneDAL) RandomForest")
+        else:
+            print("⚠️  scikit-learn-intelex not installed, using stock RandomForest")
+    
     # Split data
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, 
@@ -66,17 +113,29 @@ def train_model(X, y):
     print(f"✓ Training set: {len(X_train)} samples")
     print(f"✓ Test set: {len(X_test)} samples")
     
+    # One tree-building thread per physical core; SMT siblings only contend
+    # for the same split-scanning units
+    n_jobs = joblib.cpu_count(only_physical_cores=True)
+    print(f"✓ Using {n_jobs} worker threads")
+    
     # Train model
-    model = RandomForestClassifier(
+    model = estimator(
         n_estimators=Config.N_ESTIMATORS,
         random_state=Config.RANDOM_STATE,
         max_depth=20,
         min_samples_split=5,
         min_samples_leaf=2,
-        n_jobs=-1
+        n_jobs=n_jobs
     )
     
-    model.fit(X_train, y_train)
+    # Keep BLAS/OpenMP single-threaded inside each worker to avoid
+    # oversubscribing the cores
+    with threadpool_limits(limits=1):
+        model.fit(X_train, y_train)
+    
+    # n_jobs is pickled with the model; let predict_proba at serve time use
+    # the server's cores rather than this machine's count
+    model.set_params(n_jobs=-1)
     
     # Evaluate
     y_pred = model.predict(X_test)
@@ -87,29 +146,43 @@ def train_model(X, y):
     
     return model, X_test, y_test, y_pred
 
-def evaluate_model(model, X_test, y_test, y_pred, label_encoder):
+def evaluate_model(model, X_test, y_test, y_pred, label_encoder, feature_names):
     """Detailed model evaluation"""
     print("\n📈 Model Evaluation:")
     print("=" * 60)
     
-    # Overall metrics
+    # Compute the per-crop metrics in one pass and render from the dict
+    report = classification_report(
+        y_test, y_pred,
+        labels=np.arange(len(label_encoder.classes_)),
+        target_names=label_encoder.classes_,
+        zero_division=0,
+        output_dict=True
+    )
+    
+    # Overall metrics. With labels= the report only has an 'accuracy' entry
+    # when every class appears, and a 'micro avg' row otherwise
+    report.pop('accuracy', None)
     accuracy = accuracy_score(y_test, y_pred)
     print(f"Overall Accuracy: {accuracy * 100:.2f}%")
     
     # Per-crop report
     print("\nPer-Crop Performance:")
-    print(classification_report(
-        y_test, y_pred, 
-        target_names=label_encoder.classes_,
-        zero_division=0
-    ))
+    lines = [f"{'':>14s} {'precision':>9s} {'recall':>9s} {'f1-score':>9s} {'support':>9s}"]
+    lines.extend(
+        f"{name:>14s} {m['precision']:9.2f} {m['recall']:9.2f} {m['f1-score']:9.2f} {m['support']:9.0f}"
+        for name, m in report.items()
+    )
+    print("\n".join(lines))
     
-    # Feature importance
+    # Feature importance, in the model's own feature order
     feature_importance = model.feature_importances_
+    bars = (feature_importance * 50).astype(int)
     print("\nFeature Importance:")
-    for i, importance in enumerate(feature_importance):
-        feature_name = ['N', 'P', 'K', 'pH', 'temperature', 'humidity', 'rainfall'][i]
-        print(f"  {feature_name:12s}: {importance:.4f} {'█' * int(importance * 50)}")
+    print("\n".join(
+        f"  {name:12s}: {importance:.4f} {'█' * bar}"
+        for name, importance, bar in zip(feature_names, feature_importance.tolist(), bars.tolist())
+    ))
 
 def save_model(model, label_encoder, feature_names):
     """Save trained model and encoders"""
@@ -118,10 +191,22 @@ def save_model(model, label_encoder, feature_names):
     # Ensure models directory exists
     Config.MODELS_DIR.mkdir(parents=True, exist_ok=True)
     
-    # Save model
-    joblib.dump(model, Config.MODEL_PATH)
+    # Save model uncompressed: compression prevents the backend from
+    # memory-mapping its arrays with joblib.load(..., mmap_mode='r')
+    joblib.dump(model, Config.MODEL_PATH, compress=0)
     print(f"✓ Model saved to: {Config.MODEL_PATH}")
     
+    # Save an ONNX copy for the backend's ONNX Runtime inference path
+    if ONNX_EXPORT_AVAILABLE:
+        try:
+            onnx_model = export_onnx(model, model.n_features_in_)
+            Config.ONNX_MODEL_PATH.write_bytes(onnx_model.SerializeToString())
+            print(f"✓ ONNX model saved to: {Config.ONNX_MODEL_PATH}")
+        except Exception as e:
+            print(f"⚠️  ONNX export failed, backend will use the pickled model: {e}")
+    else:
+        print("⚠️  skl2onnx not installed, skipping ONNX export")
+    
     # Save label encoder
     joblib.dump(label_encoder, Config.LABEL_ENCODER_PATH)
     print(f"✓ Label encoder saved to: {Config.LABEL_ENCODER_PATH}")
@@ -132,6 +217,13 @@ def save_model(model, label_encoder, feature_names):
 
 def main():
     """Main training pipeline"""
+    parser = argparse.ArgumentParser(description='Train the crop recommendation model')
+    parser.add_argument(
+        '--sklearnex', action='store_true',
+        help='train with scikit-learn-intelex (the backend must have it installed too)'
+    )
+    args = parser.parse_args()
+    
     print("🌱 AgroMind AI - Model Training")
     print("=" * 60)
     
@@ -142,10 +234,10 @@ def main():
     X, y, label_encoder, feature_names = preprocess_data(df)
     
     # Train
-    model, X_test, y_test, y_pred = train_model(X, y)
+    model, X_test, y_test, y_pred = train_model(X, y, use_sklearnex=args.sklearnex)
     
     # Evaluate
-    evaluate_model(model, X_test, y_test, y_pred, label_encoder)
+    evaluate_model(model, X_test, y_test, y_pred, label_encoder, feature_names)
     
     # Save
     save_model(model, label_encoder, feature_names)